@@ -341,7 +341,7 @@ async def get_or_create_project_sandbox(client, project_id: str, sandbox_cache={
         try:
             logger.info(f"Creating new sandbox for project {project_id}")
             sandbox_pass = str(uuid.uuid4())
-            sandbox = create_sandbox(sandbox_pass, sandbox_id=project_id)
+            sandbox = await create_sandbox(sandbox_pass, sandbox_id=project_id)
             sandbox_id = sandbox.id
             
             logger.info(f"Created new sandbox {sandbox_id} with preview: {sandbox.get_preview_link(6080)}/vnc_lite.html?password={sandbox_pass}")
@@ -3,7 +3,7 @@ import json
 
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from agentpress.thread_manager import ThreadManager
-from sandbox.sandbox import SandboxToolsBase, Sandbox
+from sandbox.sandbox import SandboxToolsBase, Sandbox, wait_for_supervisord
 from utils.logger import logger
 
 
@@ -28,6 +28,8 @@ class SandboxBrowserTool(SandboxToolsBase):
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
+            # The browser API is run by supervisord, which may still be starting
+            await wait_for_supervisord(self.sandbox_id)
             
             # Build the curl command
             url = f"http://localhost:8002/api/automation/{endpoint}"
@@ -2,7 +2,6 @@ import os
 from dotenv import load_dotenv
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.sandbox import SandboxToolsBase  # Removed: Sandbox
-from utils.files_utils import clean_path
 from agent.tools.sb_shell_tool import SandboxShellTool
 from agentpress.thread_manager import ThreadManager
 
@@ -18,10 +17,6 @@ class SandboxDeployTool(SandboxToolsBase):
         self.cloudflare_api_token = os.getenv("CLOUDFLARE_API_TOKEN")
         self.shell_tool = SandboxShellTool(project_id, thread_manager)
 
-    def clean_path(self, path: str) -> str:
-        """Clean and normalize a path to be relative to /workspace"""
-        return clean_path(path, self.workspace_path)
-
     @openapi_schema({
         "type": "function",
         "function": {
@@ -3,7 +3,7 @@ from typing import Optional
 
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.sandbox import SandboxToolsBase, Sandbox
-from utils.files_utils import EXCLUDED_FILES, EXCLUDED_DIRS, EXCLUDED_EXT, should_exclude_file, clean_path
+from utils.files_utils import EXCLUDED_FILES, EXCLUDED_DIRS, EXCLUDED_EXT, should_exclude_file
 from agentpress.thread_manager import ThreadManager
 import os
 
@@ -15,10 +15,6 @@ class SandboxFilesTool(SandboxToolsBase):
         self.SNIPPET_LINES = 4  # Number of context lines to show around edits
         self.workspace_path = "/workspace"  # Ensure we're always operating in /workspace
 
-    def clean_path(self, path: str) -> str:
-        """Clean and normalize a path to be relative to /workspace"""
-        return clean_path(path, self.workspace_path)
-
     def _should_exclude_file(self, rel_path: str) -> bool:
         """Check if a file should be excluded based on path, name, or extension"""
         return should_exclude_file(rel_path)
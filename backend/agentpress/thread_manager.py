@@ -11,6 +11,7 @@ This module provides comprehensive conversation management, including:
 """
 
 import json
+import asyncio
 from typing import List, Dict, Any, Optional, Type, Union, AsyncGenerator, Literal
 from services.llm import make_llm_api_call
 from agentpress.tool import Tool
@@ -45,6 +46,9 @@ class ThreadManager:
             add_message_callback=self.add_message
         )
         self.context_manager = ContextManager()
+        # project_id -> in-flight task resolving (sandbox, sandbox_id, sandbox_pass), so sandbox tools
+        # resolving concurrently share one lookup; entries are removed as soon as they settle
+        self.sandbox_bundles: Dict[str, asyncio.Task] = {}
 
     def add_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
         """Add a tool to the ThreadManager."""
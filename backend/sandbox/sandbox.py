@@ -1,22 +1,42 @@
 import os
-from typing import Optional
+import re
+import time
+import logging
+import random
+import asyncio
+from contextlib import nullcontext
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Dict, Optional, Tuple
 
 from daytona_sdk import Daytona, DaytonaConfig, CreateSandboxParams, Sandbox, SessionExecuteRequest
+from daytona_api_client import rest
 from daytona_api_client.models.workspace_state import WorkspaceState
 from dotenv import load_dotenv
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 
 from agentpress.tool import Tool
+from services.supabase import DBConnection
 from utils.logger import logger
 from utils.files_utils import clean_path
 from utils.thread_manager import ThreadManager
 
-load_dotenv()
+@lru_cache(maxsize=1)
+def _env() -> Dict[str, Optional[str]]:
+    """Load .env once and snapshot the settings this module reads."""
+    load_dotenv()
+    keys = (
+        "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET",
+        "SANDBOX_MAX_CONCURRENT_STARTS", "SANDBOX_MAX_CONCURRENT_CREATES"
+    )
+    return {k: os.environ.get(k) for k in keys}
 
 logger.debug("Initializing Daytona sandbox configuration")
 config = DaytonaConfig(
-    api_key=os.getenv("DAYTONA_API_KEY"),
-    server_url=os.getenv("DAYTONA_SERVER_URL"),
-    target=os.getenv("DAYTONA_TARGET")
+    api_key=_env()["DAYTONA_API_KEY"],
+    server_url=_env()["DAYTONA_SERVER_URL"],
+    target=_env()["DAYTONA_TARGET"]
 )
 
 if config.api_key:
@@ -25,83 +45,325 @@ else:
     logger.warning("No Daytona API key found in environment variables")
 
 if config.server_url:
-    logger.debug(f"Daytona server URL set to: {config.server_url}")
+    logger.debug("Daytona server URL set to: %s", config.server_url)
 else:
     logger.warning("No Daytona server URL found in environment variables")
 
 if config.target:
-    logger.debug(f"Daytona target set to: {config.target}")
+    logger.debug("Daytona target set to: %s", config.target)
 else:
     logger.warning("No Daytona target found in environment variables")
 
-daytona = Daytona(config)
-logger.debug("Daytona client initialized")
+# Fixed parts of every sandbox; create_sandbox only adds labels and the VNC password
+SANDBOX_IMAGE = "adamcohenhillel/kortix-suna:0.0.20"
+SANDBOX_ENV_VARS = {
+    "CHROME_PERSISTENT_SESSION": "true",
+    "RESOLUTION": "1024x768x24",
+    "RESOLUTION_WIDTH": "1024",
+    "RESOLUTION_HEIGHT": "768",
+    "ANONYMIZED_TELEMETRY": "false",
+    "CHROME_PATH": "",
+    "CHROME_USER_DATA": "",
+    "CHROME_DEBUGGING_PORT": "9222",
+    "CHROME_DEBUGGING_HOST": "localhost",
+    "CHROME_CDP": ""
+}
+SANDBOX_PORTS = (6080, 5900, 5901, 9222, 8080, 8002)
+SANDBOX_RESOURCES = {"cpu": 2, "memory": 4, "disk": 5}
+
+# The SDK is synchronous: concurrency is bounded by the worker threads that run
+# its calls. Each worker holds at most one connection at a time, so a larger
+# pool could never be used
+DAYTONA_MAX_WORKERS = 50
+DAYTONA_POOL_MAXSIZE = DAYTONA_MAX_WORKERS
+_sdk_executor = ThreadPoolExecutor(max_workers=DAYTONA_MAX_WORKERS, thread_name_prefix="daytona")
+
+def _tune_connection_pool(client: Daytona) -> None:
+    """Rebuild the SDK's urllib3 pool so parallel calls don't queue on a few sockets.
+
+    The workspace and toolbox APIs share this ApiClient, so sandbox process,
+    filesystem and preview calls use the same pool.
+    """
+    api_client = getattr(client, "api_client", None)
+    if api_client is None:
+        logger.warning("Daytona client has no api_client, keeping the default connection pool")
+        return
+    api_client.configuration.connection_pool_maxsize = DAYTONA_POOL_MAXSIZE
+    api_client.rest_client = rest.RESTClientObject(api_client.configuration)
+
+# Created on first use so processes that never touch a sandbox skip client setup
+_daytona: Optional[Daytona] = None
+_daytona_lock = asyncio.Lock()
+
+def _build_daytona() -> Daytona:
+    client = Daytona(config)
+    _tune_connection_pool(client)
+    return client
+
+async def _get_daytona() -> Daytona:
+    """Return the shared Daytona client, creating it on first use."""
+    global _daytona
+    if _daytona is None:
+        async with _daytona_lock:
+            if _daytona is None:
+                if not config.api_key:
+                    raise RuntimeError("DAYTONA_API_KEY is not set; cannot create a Daytona client")
+                _daytona = await _run_sync(_build_daytona)
+                logger.debug("Daytona client initialized")
+    return _daytona
+
+# Bound in-flight starts and creates separately so bursts queue here instead of
+# overwhelming the control plane; plain lookups are not gated
+def _env_limit(key: str, default: int) -> int:
+    """Read a positive integer limit from the env snapshot, falling back to default."""
+    value = _env()[key]
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        logger.warning("Ignoring invalid %s=%r, using %d", key, value, default)
+        return default
+    return limit
+
+_start_semaphore = asyncio.Semaphore(_env_limit("SANDBOX_MAX_CONCURRENT_STARTS", 32))
+_create_semaphore = asyncio.Semaphore(_env_limit("SANDBOX_MAX_CONCURRENT_CREATES", 32))
+
+# Ready sandboxes are reused for a short window so repeated lookups skip the GET
+SANDBOX_CACHE_TTL = 30.0
+_sandbox_cache: Dict[str, Tuple[float, Sandbox]] = {}
+_sandbox_inflight: Dict[str, asyncio.Task] = {}
+
+# project_id -> (cached_at, (sandbox_id, sandbox_pass)), so new tool instances skip the projects query
+PROJECT_SANDBOX_CACHE_TTL = 60.0
+_project_sandbox_cache: Dict[str, Tuple[float, Tuple[str, Optional[str]]]] = {}
+_project_sandbox_inflight: Dict[str, asyncio.Task] = {}
+
+# sandbox_id -> (sandbox, background supervisord launch); holding the task also keeps it from being GC'd.
+# Successful launches are dropped; failed ones are kept for SUPERVISORD_FAILURE_TTL seconds so the
+# next wait_for_supervisord can relaunch them, then expire so the registry stays bounded
+SUPERVISORD_FAILURE_TTL = 300.0
+_supervisord_tasks: Dict[str, Tuple[Sandbox, asyncio.Task]] = {}
+
+async def _run_sync(func, *args, **kwargs):
+    """Run a blocking Daytona SDK call in a worker thread so the event loop stays free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sdk_executor, partial(func, *args, **kwargs))
+
+# Matches the HTTP status quoted in SDK error text, e.g. "(503)" from the API client
+# or "statusCode":429 from the control-plane response body
+_STATUS_IN_MESSAGE = re.compile(r'\((\d{3})\)|status_?code"?\s*[:=]\s*(\d{3})', re.IGNORECASE)
+
+def _error_status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status
+    match = _STATUS_IN_MESSAGE.search(str(error))
+    if match:
+        return int(match.group(1) or match.group(2))
+    return None
+
+def _is_transient(error: BaseException) -> bool:
+    """Whether a control-plane failure is worth retrying (network errors, throttling, 5xx).
+
+    daytona_sdk re-raises API failures as DaytonaError carrying only the message
+    (``raise ... from None``), so the implicit context chain is walked as well and
+    the status code is recovered from the error text when no attribute has it.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectionError, Urllib3HTTPError)):
+            return True
+        status = _error_status(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        error = error.__cause__ or error.__context__
+    return False
+
+async def _run_sync_with_retry(func, *args, attempts: int = 3, base_delay: float = 0.25,
+                               semaphore: Optional[asyncio.Semaphore] = None):
+    """Like _run_sync, but retries transient failures with jittered exponential backoff.
+
+    The optional semaphore is held per attempt, not across the backoff sleeps.
+    """
+    for attempt in range(attempts):
+        try:
+            async with semaphore or nullcontext():
+                return await _run_sync(func, *args)
+        except Exception as e:
+            if attempt == attempts - 1 or not _is_transient(e):
+                raise
+            delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+            logger.warning("Transient Daytona error (attempt %d/%d), retrying in %.2fs: %s", attempt + 1, attempts, delay, e)
+            await asyncio.sleep(delay)
+
+def _cache_get(cache: Dict[str, tuple], key: str, ttl: float):
+    """Return the cached value for key, evicting it if it has outlived ttl."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= ttl:
+        del cache[key]
+        return None
+    return entry[1]
+
+def _cache_put(cache: Dict[str, tuple], key: str, value, ttl: float) -> None:
+    """Store value under key, sweeping expired entries so the cache stays bounded by ttl."""
+    now = time.monotonic()
+    for stale in [k for k, (cached_at, _) in cache.items() if now - cached_at >= ttl]:
+        del cache[stale]
+    cache[key] = (now, value)
+
+def _coalesce(inflight: Dict[str, asyncio.Task], key: str, factory) -> asyncio.Task:
+    """Return the in-flight task for key, starting one from factory if none is running."""
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    return task
 
 async def get_or_start_sandbox(sandbox_id: str):
-    logger.info(f"Getting or starting sandbox with ID: {sandbox_id}")
+    cached = _cache_get(_sandbox_cache, sandbox_id, SANDBOX_CACHE_TTL)
+    if cached is not None:
+        return cached
+    # Concurrent callers share a single lookup/start instead of racing each other
+    task = _coalesce(_sandbox_inflight, sandbox_id, lambda: _get_or_start_sandbox(sandbox_id))
+    return await asyncio.shield(task)
+
+async def _get_or_start_sandbox(sandbox_id: str):
+    logger.info("Getting or starting sandbox with ID: %s", sandbox_id)
     try:
-        sandbox = daytona.get_current_sandbox(sandbox_id)
+        daytona = await _get_daytona()
+        sandbox = await _run_sync(daytona.get_current_sandbox, sandbox_id)
         if sandbox.instance.state in {WorkspaceState.ARCHIVED, WorkspaceState.STOPPED}:
-            logger.info(f"Sandbox is in {sandbox.instance.state} state. Starting...")
+            logger.info("Sandbox is in %s state. Starting...", sandbox.instance.state)
             try:
-                daytona.start(sandbox)
-                sandbox = daytona.get_current_sandbox(sandbox_id)
-                start_supervisord_session(sandbox)
+                await _run_sync_with_retry(daytona.start, sandbox, semaphore=_start_semaphore)
+                # start() waits for the sandbox and refreshes its instance, so only re-fetch if it didn't
+                if sandbox.instance.state != WorkspaceState.STARTED:
+                    sandbox = await _run_sync(daytona.get_current_sandbox, sandbox_id)
+                start_supervisord_in_background(sandbox)
             except Exception as e:
-                logger.error(f"Error starting sandbox: {e}")
+                logger.error("Error starting sandbox: %s", e)
                 raise e
-        logger.info(f"Sandbox {sandbox_id} is ready")
+        logger.info("Sandbox %s is ready", sandbox_id)
+        _cache_put(_sandbox_cache, sandbox_id, sandbox, SANDBOX_CACHE_TTL)
         return sandbox
     except Exception as e:
-        logger.error(f"Error retrieving or starting sandbox: {str(e)}")
+        _sandbox_cache.pop(sandbox_id, None)
+        logger.error("Error retrieving or starting sandbox: %s", e)
         raise e
 
-def start_supervisord_session(sandbox: Sandbox):
-    session_id = "supervisord-session"
+async def start_supervisord_session(sandbox: Sandbox, session_id: str = "supervisord-session"):
     try:
-        logger.info(f"Creating session {session_id} for supervisord")
-        sandbox.process.create_session(session_id)
-        sandbox.process.execute_session_command(session_id, SessionExecuteRequest(
+        logger.info("Creating session %s for supervisord", session_id)
+        await _run_sync(sandbox.process.create_session, session_id)
+        await _run_sync(sandbox.process.execute_session_command, session_id, SessionExecuteRequest(
             command="exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf",
             var_async=True
         ))
-        logger.info(f"Supervisord started in session {session_id}")
+        logger.info("Supervisord started in session %s", session_id)
     except Exception as e:
-        logger.error(f"Error starting supervisord session: {str(e)}")
+        logger.error("Error starting supervisord session: %s", e)
         raise e
 
-def create_sandbox(password: str, sandbox_id: str = None):
+def start_supervisord_in_background(sandbox: Sandbox, session_id: str = "supervisord-session") -> asyncio.Task:
+    """Launch supervisord without blocking the caller; see wait_for_supervisord."""
+    task = asyncio.create_task(start_supervisord_session(sandbox, session_id))
+    _supervisord_tasks[sandbox.id] = (sandbox, task)
+
+    def _forget(t: asyncio.Task) -> None:
+        entry = _supervisord_tasks.get(sandbox.id)
+        if entry is not None and entry[1] is t:
+            del _supervisord_tasks[sandbox.id]
+
+    def _on_done(t: asyncio.Task) -> None:
+        # Retrieving the exception marks it handled; start_supervisord_session already logged it
+        if t.cancelled() or t.exception() is not None:
+            asyncio.get_running_loop().call_later(SUPERVISORD_FAILURE_TTL, _forget, t)
+        else:
+            _forget(t)
+
+    task.add_done_callback(_on_done)
+    return task
+
+async def wait_for_supervisord(sandbox_id: str) -> None:
+    """Wait for the background supervisord launch for this sandbox.
+
+    If the last launch failed it is started again, so a transient failure doesn't
+    leave the sandbox without supervisord for the life of the process.
+    """
+    entry = _supervisord_tasks.get(sandbox_id)
+    if entry is None:
+        return
+    sandbox, task = entry
+    if task.done() and (task.cancelled() or task.exception() is not None):
+        logger.info("Relaunching supervisord for sandbox %s after a failed start", sandbox_id)
+        # The failed attempt may have left its session behind, so use a fresh one
+        task = start_supervisord_in_background(sandbox, f"supervisord-session-{uuid4().hex[:8]}")
+    await asyncio.shield(task)
+
+async def create_sandbox(password: str, sandbox_id: str = None):
     logger.debug("Creating new Daytona sandbox environment")
     logger.debug("Configuring sandbox with browser-use image and environment variables")
     labels = {'id': sandbox_id} if sandbox_id else None
     params = CreateSandboxParams(
-        image="adamcohenhillel/kortix-suna:0.0.20",
+        image=SANDBOX_IMAGE,
         public=True,
         labels=labels,
-        env_vars={
-            "CHROME_PERSISTENT_SESSION": "true",
-            "RESOLUTION": "1024x768x24",
-            "RESOLUTION_WIDTH": "1024",
-            "RESOLUTION_HEIGHT": "768",
-            "VNC_PASSWORD": password,
-            "ANONYMIZED_TELEMETRY": "false",
-            "CHROME_PATH": "",
-            "CHROME_USER_DATA": "",
-            "CHROME_DEBUGGING_PORT": "9222",
-            "CHROME_DEBUGGING_HOST": "localhost",
-            "CHROME_CDP": ""
-        },
-        ports=[6080, 5900, 5901, 9222, 8080, 8002],
-        resources={"cpu": 2, "memory": 4, "disk": 5}
+        env_vars={**SANDBOX_ENV_VARS, "VNC_PASSWORD": password},
+        ports=SANDBOX_PORTS,
+        resources=SANDBOX_RESOURCES
     )
-    sandbox = daytona.create(params)
-    logger.debug(f"Sandbox created with ID: {sandbox.id}")
-    start_supervisord_session(sandbox)
+    daytona = await _get_daytona()
+    async with _create_semaphore:
+        sandbox = await _run_sync(daytona.create, params)
+    logger.debug("Sandbox created with ID: %s", sandbox.id)
+    start_supervisord_in_background(sandbox)
     logger.debug("Sandbox environment successfully initialized")
     return sandbox
 
+async def _fetch_project_sandbox(db: DBConnection, project_id: str) -> Tuple[str, Optional[str]]:
+    client = await db.client
+    project = await client.table('projects').select('sandbox').eq('project_id', project_id).limit(1).maybe_single().execute()
+    # maybe_single() yields no response at all when the row is missing
+    if not project or not project.data:
+        raise ValueError(f"Project {project_id} not found")
+    sandbox_info = project.data.get('sandbox') or {}
+    if not sandbox_info.get('id'):
+        raise ValueError(f"No sandbox found for project {project_id}")
+    info = (sandbox_info['id'], sandbox_info.get('pass'))
+    _cache_put(_project_sandbox_cache, project_id, info, PROJECT_SANDBOX_CACHE_TTL)
+    return info
+
+async def get_project_sandbox_info(db: DBConnection, project_id: str) -> Tuple[str, Optional[str]]:
+    """Resolve a project's (sandbox_id, sandbox_pass), reusing recent lookups.
+
+    The database client is only acquired on a cache miss.
+    """
+    cached = _cache_get(_project_sandbox_cache, project_id, PROJECT_SANDBOX_CACHE_TTL)
+    if cached is not None:
+        return cached
+    task = _coalesce(_project_sandbox_inflight, project_id, lambda: _fetch_project_sandbox(db, project_id))
+    return await asyncio.shield(task)
+
+@lru_cache(maxsize=2048)
+def _cached_clean_path(workspace_path: str, path: str) -> str:
+    # Tools clean the same handful of paths over and over within a turn
+    return clean_path(path, workspace_path)
+
 class SandboxToolsBase(Tool):
-    _urls_printed = False
+    # Tool itself is not slotted, so instances still carry a __dict__ for subclass state;
+    # the slots give the hot attributes below fixed storage and descriptor-based access
+    __slots__ = ("project_id", "thread_manager", "workspace_path", "_sandbox", "_sandbox_id", "_sandbox_pass")
+
+    # Set once the preview URLs have been logged for this process
+    _urls_event = asyncio.Event()
+    _urls_lock = asyncio.Lock()
 
     def __init__(self, project_id: str, thread_manager: Optional[ThreadManager] = None):
         super().__init__()
@@ -112,30 +374,37 @@ class SandboxToolsBase(Tool):
         self._sandbox_id = None
         self._sandbox_pass = None
 
+    async def _resolve_sandbox(self) -> Tuple[Sandbox, str, Optional[str]]:
+        db = self.thread_manager.db if self.thread_manager else DBConnection()
+        sandbox_id, sandbox_pass = await get_project_sandbox_info(db, self.project_id)
+        sandbox = await get_or_start_sandbox(sandbox_id)
+        # VNC, the website server and the browser API all run under supervisord;
+        # this also relaunches it if its background start failed
+        await wait_for_supervisord(sandbox_id)
+        return sandbox, sandbox_id, sandbox_pass
+
     async def _ensure_sandbox(self) -> Sandbox:
         if self._sandbox is None:
+            # Tools on the same ThreadManager that resolve concurrently share one lookup. The
+            # ThreadManager outlives a run, so the task is dropped once settled and later
+            # runs go back through get_or_start_sandbox to re-check the sandbox state
+            bundles = self.thread_manager.sandbox_bundles if self.thread_manager else {}
             try:
-                client = await self.thread_manager.db.client
-                project = await client.table('projects').select('*').eq('project_id', self.project_id).execute()
-                if not project.data:
-                    raise ValueError(f"Project {self.project_id} not found")
-                project_data = project.data[0]
-                sandbox_info = project_data.get('sandbox', {})
-                if not sandbox_info.get('id'):
-                    raise ValueError(f"No sandbox found for project {self.project_id}")
-                self._sandbox_id = sandbox_info['id']
-                self._sandbox_pass = sandbox_info.get('pass')
-                self._sandbox = await get_or_start_sandbox(self._sandbox_id)
-                if not SandboxToolsBase._urls_printed:
-                    vnc_link = self._sandbox.get_preview_link(6080)
-                    website_link = self._sandbox.get_preview_link(8080)
-                    print("\033[95m***")
-                    print(f"VNC URL: {vnc_link.url if hasattr(vnc_link, 'url') else str(vnc_link)}")
-                    print(f"Website URL: {website_link.url if hasattr(website_link, 'url') else str(website_link)}")
-                    print("***\033[0m")
-                    SandboxToolsBase._urls_printed = True
+                task = _coalesce(bundles, self.project_id, self._resolve_sandbox)
+                self._sandbox, self._sandbox_id, self._sandbox_pass = await asyncio.shield(task)
+                if not SandboxToolsBase._urls_event.is_set():
+                    async with SandboxToolsBase._urls_lock:
+                        if not SandboxToolsBase._urls_event.is_set():
+                            vnc_link, website_link = await asyncio.gather(
+                                _run_sync(self._sandbox.get_preview_link, 6080),
+                                _run_sync(self._sandbox.get_preview_link, 8080)
+                            )
+                            logger.info("VNC URL: %s", getattr(vnc_link, 'url', vnc_link))
+                            logger.info("Website URL: %s", getattr(website_link, 'url', website_link))
+                            SandboxToolsBase._urls_event.set()
             except Exception as e:
-                logger.error(f"Error retrieving sandbox for project {self.project_id}: {str(e)}", exc_info=True)
+                _project_sandbox_cache.pop(self.project_id, None)
+                logger.error("Error retrieving sandbox for project %s: %s", self.project_id, e, exc_info=True)
                 raise e
         return self._sandbox
 
@@ -152,6 +421,7 @@ class SandboxToolsBase(Tool):
         return self._sandbox_id
 
     def clean_path(self, path: str) -> str:
-        cleaned_path = clean_path(path, self.workspace_path)
-        logger.debug(f"Cleaned path: {path} -> {cleaned_path}")
+        cleaned_path = _cached_clean_path(self.workspace_path, path)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cleaned path: %s -> %s", path, cleaned_path)
         return cleaned_path
@@ -0,0 +1,58 @@
+"""
+Tests for Daytona client initialization in the sandbox module.
+
+Concurrent first uses must share a single lazily created client.
+"""
+
+import asyncio
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import sandbox.sandbox as sandbox_module
+
+def slow_client(config):
+    # Construction runs on a worker thread; keep it busy long enough that every
+    # other caller reaches _get_daytona while the first one is still building
+    time.sleep(0.05)
+    return object()
+
+@pytest.mark.asyncio
+async def test_single_daytona_client():
+    """Test that concurrent first calls build exactly one Daytona client."""
+    fake_daytona = MagicMock(side_effect=slow_client)
+    with patch.object(sandbox_module, "Daytona", fake_daytona), \
+         patch.object(sandbox_module, "_tune_connection_pool"), \
+         patch.object(sandbox_module.config, "api_key", "test-key"), \
+         patch.object(sandbox_module, "_daytona", None), \
+         patch.object(sandbox_module, "_daytona_lock", asyncio.Lock()):
+        clients = await asyncio.gather(*(sandbox_module._get_daytona() for _ in range(10)))
+
+        assert fake_daytona.call_count == 1, f"Expected one Daytona instance, got {fake_daytona.call_count}"
+        assert all(client is clients[0] for client in clients), "All callers should share the same client"
+
+    print("✅ Daytona client created once and shared")
+
+@pytest.mark.asyncio
+async def test_missing_api_key():
+    """Test that a missing API key fails loudly instead of building a client."""
+    with patch.object(sandbox_module.config, "api_key", None), \
+         patch.object(sandbox_module, "_daytona", None):
+        try:
+            await sandbox_module._get_daytona()
+        except RuntimeError:
+            print("✅ Missing API key raises RuntimeError")
+            return
+    raise AssertionError("Expected RuntimeError when DAYTONA_API_KEY is unset")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(test_single_daytona_client())
+        asyncio.run(test_missing_api_key())
+        print("\n✅ Test completed successfully")
+        sys.exit(0)
+    except AssertionError as e:
+        print(f"\n\n❌ Test failed: {str(e)}")
+        sys.exit(1)
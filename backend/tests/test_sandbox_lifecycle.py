@@ -0,0 +1,204 @@
+"""
+Tests for sandbox lifecycle helpers in the sandbox module.
+
+Covers the background supervisord launch used after a sandbox is started or
+created, the transient-error retry around sandbox starts, and how sandbox
+tools share a resolved sandbox.
+"""
+
+import asyncio
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import sandbox.sandbox as sandbox_module
+
+class ApiError(Exception):
+    """Stand-in for the generated API client's exception, which carries a status."""
+
+    def __init__(self, status: int):
+        super().__init__(f"({status})\nReason: HTTP {status}")
+        self.status = status
+
+class DaytonaError(Exception):
+    """Stand-in for the SDK error that wraps API failures with only a message."""
+
+def wrapped(status: int) -> DaytonaError:
+    """Build a DaytonaError the way the SDK does: re-raised from None over the API error."""
+    try:
+        try:
+            raise ApiError(status)
+        except ApiError:
+            raise DaytonaError("Failed to start sandbox") from None
+    except DaytonaError as e:
+        return e
+
+def failing(errors):
+    """Return a callable that raises each error in turn, then returns "started"."""
+    calls = {"count": 0}
+
+    def call():
+        calls["count"] += 1
+        if errors:
+            raise errors.pop(0)
+        return "started"
+
+    return call, calls
+
+def make_sandbox(sandbox_id: str) -> MagicMock:
+    sandbox = MagicMock()
+    sandbox.id = sandbox_id
+    return sandbox
+
+@pytest.mark.asyncio
+async def test_supervisord_relaunch_after_failure():
+    """Test that a failed supervisord launch is retried by the next waiter."""
+    sandbox = make_sandbox("sb-supervisord")
+    sandbox.process.execute_session_command.side_effect = [Exception("supervisord failed"), None]
+
+    with patch.object(sandbox_module, "_supervisord_tasks", {}):
+        sandbox_module.start_supervisord_in_background(sandbox)
+
+        try:
+            await sandbox_module.wait_for_supervisord(sandbox.id)
+            raise AssertionError("First wait should surface the failed launch")
+        except Exception as e:
+            assert str(e) == "supervisord failed", f"Unexpected error: {e}"
+
+        # The next waiter relaunches instead of re-raising the stale failure
+        await sandbox_module.wait_for_supervisord(sandbox.id)
+        assert sandbox.process.execute_session_command.call_count == 2, "Expected supervisord to be relaunched"
+        assert sandbox.id not in sandbox_module._supervisord_tasks, "Successful launch should be dropped"
+
+        # Once running, waiting is a no-op
+        await sandbox_module.wait_for_supervisord(sandbox.id)
+        assert sandbox.process.execute_session_command.call_count == 2
+
+    print("✅ Failed supervisord launch is relaunched")
+
+@pytest.mark.asyncio
+async def test_failed_supervisord_launch_expires():
+    """Test that a failed launch nobody waits on is eventually dropped from the registry."""
+    sandbox = make_sandbox("sb-unused")
+    sandbox.process.execute_session_command.side_effect = Exception("supervisord failed")
+
+    with patch.object(sandbox_module, "_supervisord_tasks", {}), \
+         patch.object(sandbox_module, "SUPERVISORD_FAILURE_TTL", 0.05):
+        task = sandbox_module.start_supervisord_in_background(sandbox)
+        await asyncio.wait([task])
+        assert sandbox.id in sandbox_module._supervisord_tasks, "Failed launch should be kept for relaunch"
+
+        await asyncio.sleep(0.1)
+        assert sandbox.id not in sandbox_module._supervisord_tasks, "Failed launch should expire"
+
+    print("✅ Failed supervisord launch expires from the registry")
+
+@pytest.mark.asyncio
+async def test_ensure_sandbox_relaunches_supervisord():
+    """Test that any sandbox tool, not just the browser tool, relaunches a failed supervisord."""
+    sandbox = make_sandbox("sb-tool")
+    sandbox.process.execute_session_command.side_effect = [Exception("supervisord failed"), None]
+    urls_logged = asyncio.Event()
+    urls_logged.set()
+    thread_manager = MagicMock()
+    thread_manager.sandbox_bundles = {}
+
+    with patch.object(sandbox_module, "_supervisord_tasks", {}), \
+         patch.object(sandbox_module, "get_project_sandbox_info", AsyncMock(return_value=(sandbox.id, "pass"))), \
+         patch.object(sandbox_module, "get_or_start_sandbox", AsyncMock(return_value=sandbox)), \
+         patch.object(sandbox_module.SandboxToolsBase, "_urls_event", urls_logged):
+        await asyncio.wait([sandbox_module.start_supervisord_in_background(sandbox)])
+
+        await sandbox_module.SandboxToolsBase("project-1", thread_manager)._ensure_sandbox()
+        assert sandbox.process.execute_session_command.call_count == 2, "Expected supervisord to be relaunched"
+        assert sandbox.id not in sandbox_module._supervisord_tasks
+
+    print("✅ Sandbox tools relaunch a failed supervisord")
+
+def test_is_transient():
+    """Test which control-plane failures are classified as retriable."""
+    assert sandbox_module._is_transient(ApiError(429))
+    assert sandbox_module._is_transient(ApiError(503))
+    assert not sandbox_module._is_transient(ApiError(401))
+
+    # SDK-wrapped errors: status only reachable through the suppressed context
+    assert sandbox_module._is_transient(wrapped(429))
+    assert sandbox_module._is_transient(wrapped(502))
+    assert not sandbox_module._is_transient(wrapped(401))
+
+    # SDK-wrapped errors: status only present in the message text
+    assert sandbox_module._is_transient(DaytonaError("Failed to start sandbox: (500)\nReason: Internal Server Error"))
+    assert sandbox_module._is_transient(DaytonaError('Failed to start sandbox: {"statusCode":429,"message":"Too Many Requests"}'))
+    assert not sandbox_module._is_transient(DaytonaError('Failed to start sandbox: {"statusCode":401,"message":"Unauthorized"}'))
+
+    assert sandbox_module._is_transient(ConnectionError("reset by peer"))
+    assert not sandbox_module._is_transient(DaytonaError("Sandbox not found"))
+
+    print("✅ Transient errors classified correctly")
+
+@pytest.mark.asyncio
+async def test_retry_transient_start():
+    """Test that 429/5xx failures are retried and 401 is raised immediately."""
+    call, calls = failing([wrapped(429), wrapped(503)])
+    result = await sandbox_module._run_sync_with_retry(call, base_delay=0)
+    assert result == "started" and calls["count"] == 3, f"Expected success on 3rd attempt, got {calls}"
+
+    call, calls = failing([wrapped(401)])
+    try:
+        await sandbox_module._run_sync_with_retry(call, base_delay=0)
+        raise AssertionError("401 should not be retried")
+    except DaytonaError:
+        assert calls["count"] == 1, f"401 was retried: {calls}"
+
+    call, calls = failing([wrapped(500), wrapped(500), wrapped(500), wrapped(500)])
+    try:
+        await sandbox_module._run_sync_with_retry(call, attempts=3, base_delay=0)
+        raise AssertionError("Persistent 5xx should eventually be raised")
+    except DaytonaError:
+        assert calls["count"] == 3, f"Expected 3 attempts, got {calls}"
+
+    print("✅ Transient start failures retried with backoff")
+
+@pytest.mark.asyncio
+async def test_sandbox_bundle_shared_within_run_only():
+    """Test that concurrent tools share one resolution but later runs re-check the sandbox."""
+    async def resolve(sandbox_id):
+        await asyncio.sleep(0.01)
+        return make_sandbox(sandbox_id)
+
+    get_or_start = MagicMock(side_effect=resolve)
+    urls_logged = asyncio.Event()
+    urls_logged.set()
+    # The ThreadManager is shared across agent runs, as in api.py
+    thread_manager = MagicMock()
+    thread_manager.sandbox_bundles = {}
+
+    with patch.object(sandbox_module, "get_project_sandbox_info", AsyncMock(return_value=("sb-shared", "pass"))), \
+         patch.object(sandbox_module, "get_or_start_sandbox", get_or_start), \
+         patch.object(sandbox_module.SandboxToolsBase, "_urls_event", urls_logged):
+        first_run = [sandbox_module.SandboxToolsBase("project-1", thread_manager) for _ in range(3)]
+        sandboxes = await asyncio.gather(*(tool._ensure_sandbox() for tool in first_run))
+        assert get_or_start.call_count == 1, f"Concurrent tools should share one lookup, got {get_or_start.call_count}"
+        assert all(sb is sandboxes[0] for sb in sandboxes), "Concurrent tools should share the same sandbox"
+        assert not thread_manager.sandbox_bundles, "Settled resolutions should not be kept on the ThreadManager"
+
+        second_run = sandbox_module.SandboxToolsBase("project-1", thread_manager)
+        await second_run._ensure_sandbox()
+        assert get_or_start.call_count == 2, "A later run should re-check the sandbox via get_or_start_sandbox"
+
+    print("✅ Sandbox bundle shared within a run and dropped afterwards")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(test_supervisord_relaunch_after_failure())
+        asyncio.run(test_failed_supervisord_launch_expires())
+        asyncio.run(test_ensure_sandbox_relaunches_supervisord())
+        test_is_transient()
+        asyncio.run(test_retry_transient_start())
+        asyncio.run(test_sandbox_bundle_shared_within_run_only())
+        print("\n✅ Test completed successfully")
+        sys.exit(0)
+    except AssertionError as e:
+        print(f"\n\n❌ Test failed: {str(e)}")
+        sys.exit(1)